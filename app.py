@@ -5,11 +5,15 @@ Usage:
   python app.py                  # Start interactive chat
   python app.py --ingest         # Load documents from data/raw/ into Qdrant
   python app.py --ingest --dir path/to/docs   # Custom document directory
+  python app.py --export-snapshot snapshots/latest [--dtype float16]
+  python app.py --import-snapshot snapshots/latest   # Restore without re-embedding
+  python app.py --profile        # Chat with a span breakdown + flame graph per question
 """
 
 import argparse
 import sys
-from pipeline import ingest, ask
+from pipeline import ingest, ask, export_snapshot, import_snapshot
+from src.serving.tracing import trace, format_trace
 
 
 WELCOME = """
@@ -22,7 +26,7 @@ WELCOME = """
 """
 
 
-def run_chat() -> None:
+def run_chat(profile: bool = False) -> None:
     print(WELCOME)
     while True:
         try:
@@ -39,8 +43,15 @@ def run_chat() -> None:
             break
 
         print("\nAssistant: ", end="", flush=True)
-        answer = ask(question)
-        print(answer)
+        if profile:
+            with trace("ask", profile=True, question=question) as root:
+                answer = ask(question)
+            print(answer)
+            print("\n--- trace ---")
+            print(format_trace(root))
+        else:
+            answer = ask(question)
+            print(answer)
         print()
 
 
@@ -56,14 +67,44 @@ def main() -> None:
         default="data/raw",
         help="Document directory to ingest (default: data/raw)",
     )
+    parser.add_argument(
+        "--export-snapshot",
+        metavar="DIR",
+        help="Export the Qdrant collection (vectors + payloads) to DIR",
+    )
+    parser.add_argument(
+        "--import-snapshot",
+        metavar="DIR",
+        help="Rebuild the Qdrant collection from a snapshot in DIR",
+    )
+    parser.add_argument(
+        "--dtype",
+        choices=["float32", "float16"],
+        default="float32",
+        help="Vector precision for --export-snapshot (default: float32)",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Trace every question (spans written to TRACE_FILE) and capture a flame graph",
+    )
     args = parser.parse_args()
 
+    if args.export_snapshot:
+        export_snapshot(args.export_snapshot, dtype=args.dtype)
+        sys.exit(0)
+
+    if args.import_snapshot:
+        import_snapshot(args.import_snapshot)
+        print("Snapshot imported. Run 'python app.py' to start chatting.")
+        sys.exit(0)
+
     if args.ingest:
         ingest(data_dir=args.dir)
         print("Documents ingested. Run 'python app.py' to start chatting.")
         sys.exit(0)
 
-    run_chat()
+    run_chat(profile=args.profile)
 
 
 if __name__ == "__main__":
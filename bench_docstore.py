@@ -0,0 +1,100 @@
+"""
+bench_docstore.py — Measure what the external docstore (DOCSTORE_ENABLED) changes.
+
+Needs no Qdrant or OpenAI. Builds a synthetic corpus of CHUNK_SIZE-token chunks
+and reports:
+  1. Qdrant payload bytes per point and per query, full vs. slim payload
+     (what the cluster stores and what every retrieve() pulls over the network)
+  2. The added cost of the local batched read: docstore get_many() latency
+     for TOP_K random IDs
+
+For the end-to-end picture on a real cluster, compare the qdrant_query and
+docstore_read spans from `python app.py --profile` with the docstore off and on.
+
+Run:
+    python bench_docstore.py [--docs 20000] [--queries 2000]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+# config.py requires a key at import time; nothing here calls OpenAI
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench-fake")
+sys.path.insert(0, os.path.dirname(__file__))
+
+from config import CHUNK_SIZE, TOP_K
+from src.retrieval.docstore import DocStore, slim_payload
+
+# ~0.75 words per token for English text with the cl100k tokenizer
+_WORDS_PER_CHUNK = int(CHUNK_SIZE * 0.75)
+_VOCAB = ("riba murabaha sukuk ijara zakat contract profit sale ownership asset "
+          "scholar ruling permissible prohibited deferred payment bank the of and "
+          "to in is that it for with as by on").split()
+
+
+def _fake_payload(i: int) -> dict:
+    return {
+        "text": " ".join(random.choices(_VOCAB, k=_WORDS_PER_CHUNK)),
+        "source_type": random.choice(["hadith", "scholar", "aaoifi"]),
+        "filename": f"source_{i % 400:03d}.pdf",
+        "chunk_index": i % 50,
+        "filenames": [f"source_{i % 400:03d}.pdf", f"mirror_{i % 97:02d}.pdf"],
+    }
+
+
+def _percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the external docstore")
+    parser.add_argument("--docs", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    random.seed(0)
+    ids = [str(uuid.uuid4()) for _ in range(args.docs)]
+    payloads = [_fake_payload(i) for i in range(args.docs)]
+
+    full_bytes = sum(len(json.dumps(p).encode("utf-8")) for p in payloads) / args.docs
+    slim_bytes = sum(len(json.dumps(slim_payload(p)).encode("utf-8")) for p in payloads) / args.docs
+    vector_bytes = 1536 * 4
+
+    print(f"=== Payload size ({args.docs} chunks of ~{CHUNK_SIZE} tokens) ===")
+    print(f"full payload / point      : {full_bytes:,.0f} B")
+    print(f"slim payload / point      : {slim_bytes:,.0f} B")
+    print(f"point incl. vector, full  : {full_bytes + vector_bytes:,.0f} B")
+    print(f"point incl. vector, slim  : {slim_bytes + vector_bytes:,.0f} B "
+          f"({(slim_bytes + vector_bytes) / (full_bytes + vector_bytes):.0%} of full)")
+    print(f"payload bytes per query   : {full_bytes * TOP_K:,.0f} B → {slim_bytes * TOP_K:,.0f} B "
+          f"(top_k={TOP_K})")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = DocStore(os.path.join(tmp, "docstore.sqlite"))
+        start = time.perf_counter()
+        for i in range(0, args.docs, 1000):
+            store.put_many(list(zip(ids[i : i + 1000], payloads[i : i + 1000])))
+        load_s = time.perf_counter() - start
+
+        latencies = []
+        for _ in range(args.queries):
+            batch = random.sample(ids, TOP_K)
+            t0 = time.perf_counter()
+            store.get_many(batch)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    print(f"\n=== Local docstore read (get_many of {TOP_K} IDs, {args.queries} queries) ===")
+    print(f"write {args.docs} docs     : {load_s:.2f} s")
+    print(f"read latency (ms)         : p50={_percentile(latencies, 50):.3f}  "
+          f"p99={_percentile(latencies, 99):.3f}  max={max(latencies):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+bench_embed_batcher.py — Load check for query-embedding micro-batching.
+
+Needs no OpenAI key. A fake embeddings client sleeps --api-ms (plus a small
+per-input cost) per request. Callers arrive open-loop at each --rates value,
+and every rate runs twice:
+  unbatched : each caller makes its own embeddings request (today's path with
+              EMBED_BATCH_ENABLED=false, unlimited concurrency)
+  batched   : callers go through EmbeddingBatcher with the config defaults
+
+Reported per run: API requests sent, average batch size, caller latency
+p50/p99. Latency is measured from the scheduled arrival time.
+
+Run:
+    python bench_embed_batcher.py [--api-ms 300] [--rates 10 50 100 200] [--duration 5]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+# config.py requires a key at import time; nothing here calls OpenAI
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench-fake")
+sys.path.insert(0, os.path.dirname(__file__))
+
+from config import (
+    EMBED_BATCH_WINDOW_MS,
+    EMBED_BATCH_MAX,
+    EMBED_BATCH_TIMEOUT_SECONDS,
+    EMBED_BATCH_SENDERS,
+)
+from src.retrieval.embed_batcher import EmbeddingBatcher
+
+_PER_INPUT_MS = 0.5
+
+
+class _FakeEmbeddings:
+    """Stands in for OpenAI().embeddings with a fixed round-trip latency."""
+
+    def __init__(self, api_ms: float) -> None:
+        self._api_s = api_ms / 1000
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.inputs = 0
+
+    def create(self, model: str, input: list[str]):
+        with self._lock:
+            self.requests += 1
+            self.inputs += len(input)
+        time.sleep(self._api_s + len(input) * _PER_INPUT_MS / 1000)
+        return SimpleNamespace(
+            data=[SimpleNamespace(index=i, embedding=[0.0]) for i in range(len(input))],
+            usage=SimpleNamespace(total_tokens=10 * len(input)),
+        )
+
+
+def _percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def _run(rate: float, duration: float, api_ms: float, batched: bool) -> dict:
+    embeddings = _FakeEmbeddings(api_ms)
+    client = SimpleNamespace(embeddings=embeddings)
+    batcher = EmbeddingBatcher(
+        client,
+        "fake",
+        EMBED_BATCH_WINDOW_MS,
+        EMBED_BATCH_MAX,
+        EMBED_BATCH_TIMEOUT_SECONDS,
+        EMBED_BATCH_SENDERS,
+    )
+    latencies: list[float] = []
+    lock = threading.Lock()
+
+    def caller(n: int, scheduled: float) -> None:
+        text = f"question {n}"
+        if batched:
+            batcher.embed(text)
+        else:
+            embeddings.create(model="fake", input=[text])
+        with lock:
+            latencies.append((time.monotonic() - scheduled) * 1000)
+
+    total = int(rate * duration)
+    t0 = time.monotonic()
+    with ThreadPoolExecutor(max_workers=1024) as pool:
+        for n in range(total):
+            scheduled = t0 + n / rate
+            delay = scheduled - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(caller, n, scheduled)
+
+    return {
+        "requests": embeddings.requests,
+        "avg_batch": embeddings.inputs / embeddings.requests if embeddings.requests else 0.0,
+        "p50": _percentile(latencies, 50),
+        "p99": _percentile(latencies, 99),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load check for EmbeddingBatcher")
+    parser.add_argument("--api-ms", type=float, default=300)
+    parser.add_argument("--rates", type=float, nargs="+", default=[10, 50, 100, 200])
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"fake API latency {args.api_ms:.0f} ms, window {EMBED_BATCH_WINDOW_MS} ms, "
+          f"max batch {EMBED_BATCH_MAX}, senders {EMBED_BATCH_SENDERS}, {args.duration:.0f} s per run")
+    print(f"{'rate/s':>7} {'mode':>10} {'API reqs':>9} {'avg batch':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for rate in args.rates:
+        for batched in (False, True):
+            r = _run(rate, args.duration, args.api_ms, batched)
+            mode = "batched" if batched else "unbatched"
+            print(f"{rate:>7.0f} {mode:>10} {r['requests']:>9} {r['avg_batch']:>10.1f} "
+                  f"{r['p50']:>8.0f} {r['p99']:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
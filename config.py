@@ -22,13 +22,89 @@ CHUNK_SIZE: int = 800
 # Overlap keeps context from being cut off at chunk boundaries
 CHUNK_OVERLAP: int = 100
 
+# --- Near-duplicate chunk removal (between chunker and embedder) ---
+DEDUP_ENABLED: bool = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+# Quran is excluded on purpose: repeated ayahs must keep their own surah/ayah citation
+DEDUP_SOURCE_TYPES = ["hadith", "scholar", "aaoifi"]
+# Estimated Jaccard similarity (word 5-grams) at which two chunks count as the same passage
+DEDUP_THRESHOLD: float = float(os.getenv("DEDUP_THRESHOLD", "0.85"))
+DEDUP_NUM_PERM: int = 128      # MinHash signature length
+DEDUP_BANDS: int = 16          # LSH bands of 8 rows → candidate threshold ≈ 0.7
+DEDUP_SHINGLE_SIZE: int = 5
+
+# --- External docstore (optional) ---
+# When enabled, chunk text and full metadata live in a local SQLite file keyed by
+# point ID and Qdrant payloads keep only filterable fields. Re-ingest after
+# switching this on, so new points are written in the slim format.
+DOCSTORE_ENABLED: bool = os.getenv("DOCSTORE_ENABLED", "false").lower() == "true"
+DOCSTORE_PATH: str = os.getenv("DOCSTORE_PATH", "data/docstore.sqlite")
+
+# --- Snapshots (app.py --export-snapshot / --import-snapshot) ---
+# Worker processes used by qdrant-client's bulk upload when restoring
+SNAPSHOT_UPLOAD_PARALLEL: int = int(os.getenv("SNAPSHOT_UPLOAD_PARALLEL", "4"))
+
 # --- Retrieval ---
 # How many chunks to pull from Qdrant per question
 TOP_K: int = 5
 
+# --- Query-embedding micro-batching ---
+# Concurrent retrieve() calls share one embeddings request. The batch is sent
+# EMBED_BATCH_WINDOW_MS after its first query, or as soon as EMBED_BATCH_MAX are queued.
+# Off by default: it cuts request volume, but adds latency unless the embeddings
+# API is the bottleneck (see bench_embed_batcher.py)
+EMBED_BATCH_ENABLED: bool = os.getenv("EMBED_BATCH_ENABLED", "false").lower() == "true"
+EMBED_BATCH_WINDOW_MS: float = float(os.getenv("EMBED_BATCH_WINDOW_MS", "5"))
+EMBED_BATCH_MAX: int = int(os.getenv("EMBED_BATCH_MAX", "64"))
+# Longest a caller waits for its batched vector before failing the request
+EMBED_BATCH_TIMEOUT_SECONDS: float = float(os.getenv("EMBED_BATCH_TIMEOUT_SECONDS", "30"))
+# Embedding requests allowed in flight at once; while all are busy, batches keep growing
+EMBED_BATCH_SENDERS: int = int(os.getenv("EMBED_BATCH_SENDERS", "4"))
+
+# --- MMR diversity re-ranking (optional) ---
+# Neighbouring chunks overlap by CHUNK_OVERLAP tokens and many ayah translations
+# are near-identical, so the raw top-k is often redundant. When enabled, a larger
+# candidate pool is fetched with vectors and re-ranked with Maximal Marginal Relevance.
+# Candidates are fetched without payloads; chunk text is then read for the TOP_K
+# winners only (one extra small Qdrant round-trip, no extra payload bytes).
+MMR_ENABLED: bool = os.getenv("MMR_ENABLED", "false").lower() == "true"
+# 1.0 = pure relevance (same as plain top-k), 0.0 = pure diversity
+MMR_LAMBDA: float = float(os.getenv("MMR_LAMBDA", "0.7"))
+# How many candidates to pull from Qdrant before re-ranking down to TOP_K
+MMR_FETCH_K: int = int(os.getenv("MMR_FETCH_K", "25"))
+
+# --- Web app request coalescing ---
+# Concurrent identical /ask requests share one pipeline run. This is how long a
+# request waits for that shared answer before giving up with a 504.
+ASK_TIMEOUT_SECONDS: float = float(os.getenv("ASK_TIMEOUT_SECONDS", "60"))
+# Upper bound on pipeline runs executing at once; extra distinct questions queue
+ASK_MAX_CONCURRENT: int = int(os.getenv("ASK_MAX_CONCURRENT", "16"))
+
+# --- Tracing / profiling (app.py --profile, X-Debug-Trace header on /ask) ---
+TRACE_FILE: str = os.getenv("TRACE_FILE", "traces/traces.jsonl")
+PROFILE_DIR: str = os.getenv("PROFILE_DIR", "traces/profiles")
+PROFILE_SAMPLE_INTERVAL_MS: float = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+# The debug header is ignored unless this is set — keep it off on public deployments
+TRACE_HEADER_ENABLED: bool = os.getenv("TRACE_HEADER_ENABLED", "false").lower() == "true"
+
 # --- Tavily web search (used for scholar/fatwa questions only) ---
 TAVILY_API_KEY: str | None = os.getenv("TAVILY_API_KEY") or None
 
+# Skip Tavily when Qdrant already has strong scholarly coverage: at least
+# WEB_SEARCH_MIN_COVERAGE chunks from WEB_SEARCH_COVERAGE_SOURCES scoring
+# at or above WEB_SEARCH_SKIP_SCORE (cosine similarity).
+WEB_SEARCH_SKIP_SCORE: float = float(os.getenv("WEB_SEARCH_SKIP_SCORE", "0.6"))
+WEB_SEARCH_MIN_COVERAGE: int = int(os.getenv("WEB_SEARCH_MIN_COVERAGE", "1"))
+WEB_SEARCH_COVERAGE_SOURCES = ["scholar", "aaoifi"]
+# Hard latency budget for the Tavily call; slower results are dropped
+WEB_SEARCH_TIMEOUT_SECONDS: float = float(os.getenv("WEB_SEARCH_TIMEOUT_SECONDS", "4.0"))
+# Start Tavily in parallel with Qdrant retrieval. Lowers latency for questions
+# that need the web, but a search already started cannot be cancelled, so
+# questions the score gate would skip still pay for a Tavily call ("discarded").
+WEB_SEARCH_HEDGE: bool = os.getenv("WEB_SEARCH_HEDGE", "false").lower() == "true"
+# Threads for Tavily calls. Defaults to ASK_MAX_CONCURRENT so every concurrent
+# pipeline run can search at once without queueing behind the others.
+WEB_SEARCH_MAX_WORKERS: int = int(os.getenv("WEB_SEARCH_MAX_WORKERS", str(ASK_MAX_CONCURRENT)))
+
 # Domains restricted for Tavily search
 TAVILY_DOMAINS = [
     "isra.my",
@@ -0,0 +1,349 @@
+"""
+loadtest.py — Load-test the /ask endpoint of web_app.py.
+
+Three sub-commands:
+
+  python loadtest.py serve-fake [--port 5001] [--embed-ms 40] [--qdrant-ms 30]
+                                [--web-ms 1500] [--llm-ms 2500] [--jitter 0.3]
+      Start web_app with its backends replaced by sleep-based fakes, so you can
+      measure the server itself without spending OpenAI/Tavily credits.
+
+  python loadtest.py run --url http://localhost:5001 --mode closed --users 20 --duration 30
+  python loadtest.py run --url http://localhost:5001 --mode open --rate 10 --duration 30
+      closed : N users, each sends its next request as soon as the last returns
+               (after a connection error a user backs off, doubling from
+               --error-backoff up to 5 s, so a down server isn't hammered)
+      open   : requests arrive at a fixed rate regardless of how fast the server
+               answers. Latency is measured from the scheduled arrival time, so
+               queueing delay is included (no coordinated omission).
+      --out results.json saves the report for later comparison.
+
+  python loadtest.py compare baseline.json candidate.json
+      Print two saved reports side by side.
+
+Only the standard library is used for the load generator.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+QUESTIONS = [
+    "Is interest (riba) allowed in Islam?",
+    "What is Murabaha and how does it work?",
+    "Is it permissible to invest in cryptocurrency?",
+    "What does AAOIFI say about sukuk ownership?",
+    "What is the ruling on conventional insurance?",
+    "How is zakat calculated on shares?",
+    "What do scholars say about Islamic mortgages?",
+    "Is a profit-sharing Mudaraba contract halal?",
+]
+
+PERCENTILES = [50, 90, 95, 99]
+_MAX_BACKOFF_S = 5.0
+
+
+# --------------------------------------------------------------------------- #
+# Fake-backend server
+# --------------------------------------------------------------------------- #
+
+def _sleep_ms(ms: float, jitter: float) -> None:
+    if ms > 0:
+        time.sleep(ms / 1000 * random.uniform(1 - jitter, 1 + jitter))
+
+
+def serve_fake(args: argparse.Namespace) -> None:
+    """Run web_app with retrieve / web search / generation replaced by fakes."""
+    # config.py requires a key at import time; the fakes never use it
+    os.environ.setdefault("OPENAI_API_KEY", "sk-loadtest-fake")
+    sys.path.insert(0, os.path.dirname(__file__))
+
+    import pipeline
+    import web_app
+
+    def fake_retrieve(query: str, top_k: int = 5, **_) -> list[dict]:
+        _sleep_ms(args.embed_ms, args.jitter)
+        _sleep_ms(args.qdrant_ms, args.jitter)
+        return [{
+            "text": f"Fake passage {i} for: {query}",
+            "score": args.score,
+            "source_type": "scholar",
+            "filename": f"fake_{i}.pdf",
+            "chunk_index": i,
+            "surah": None,
+            "ayah": None,
+        } for i in range(top_k)]
+
+    def fake_web_search(query: str, max_results: int = 3) -> list[dict]:
+        _sleep_ms(args.web_ms, args.jitter)
+        return [{
+            "text": f"Fake web result for: {query}",
+            "score": 1.0,
+            "source_type": "scholar_web",
+            "filename": "https://example.org/fake",
+            "chunk_index": 0,
+            "surah": None,
+            "ayah": None,
+        }]
+
+    def fake_generate(question: str, chunks: list[dict]) -> str:
+        _sleep_ms(args.llm_ms, args.jitter)
+        return f"Fake answer to '{question}' from {len(chunks)} passages."
+
+    pipeline.retrieve = fake_retrieve
+    pipeline.search_scholar_web = fake_web_search
+    pipeline.generate_answer = fake_generate
+
+    print(f"[loadtest] Fake backends: embed={args.embed_ms}ms qdrant={args.qdrant_ms}ms "
+          f"web={args.web_ms}ms llm={args.llm_ms}ms jitter=±{args.jitter:.0%} score={args.score}")
+    print(f"[loadtest] Serving web_app on http://localhost:{args.port}")
+    web_app.app.run(debug=False, host="127.0.0.1", port=args.port, threaded=True)
+
+
+# --------------------------------------------------------------------------- #
+# Load generator
+# --------------------------------------------------------------------------- #
+
+class _Recorder:
+    """Thread-safe collection of (latency_seconds, status) samples."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.samples: list[tuple[float, int]] = []
+
+    def add(self, latency: float, status: int) -> None:
+        with self._lock:
+            self.samples.append((latency, status))
+
+
+def _send(url: str, question: str, timeout: float) -> int:
+    """POST one question and return the HTTP status (0 = connection error/timeout)."""
+    body = json.dumps({"question": question}).encode("utf-8")
+    req = urllib.request.Request(
+        url.rstrip("/") + "/ask",
+        data=body,
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, TimeoutError, ConnectionError):
+        return 0
+
+
+def _pick_question(n: int, distinct: bool) -> str:
+    question = QUESTIONS[n % len(QUESTIONS)]
+    # Distinct questions defeat request coalescing so every request does real work
+    return f"{question} (#{n})" if distinct else question
+
+
+def _run_closed(args: argparse.Namespace, rec: _Recorder) -> None:
+    deadline = time.monotonic() + args.duration
+    counter = iter(range(10**9))
+    counter_lock = threading.Lock()
+
+    def user() -> None:
+        backoff = args.error_backoff
+        while time.monotonic() < deadline:
+            with counter_lock:
+                n = next(counter)
+            start = time.monotonic()
+            status = _send(args.url, _pick_question(n, args.distinct), args.timeout)
+            rec.add(time.monotonic() - start, status)
+            if status == 0:
+                time.sleep(min(backoff, max(deadline - time.monotonic(), 0.0)))
+                backoff = min(backoff * 2, _MAX_BACKOFF_S)
+            else:
+                backoff = args.error_backoff
+
+    threads = [threading.Thread(target=user) for _ in range(args.users)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def _run_open(args: argparse.Namespace, rec: _Recorder) -> None:
+    interval = 1.0 / args.rate
+    total = int(args.duration * args.rate)
+
+    def fire(n: int, scheduled: float) -> None:
+        status = _send(args.url, _pick_question(n, args.distinct), args.timeout)
+        rec.add(time.monotonic() - scheduled, status)
+
+    t0 = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.max_inflight) as pool:
+        for n in range(total):
+            scheduled = t0 + n * interval
+            delay = scheduled - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(fire, n, scheduled)
+
+
+def _percentile(sorted_values: list[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def _summarise(args: argparse.Namespace, rec: _Recorder, elapsed: float) -> dict:
+    samples = rec.samples
+    total = len(samples)
+    ok_latencies = sorted(lat for lat, status in samples if status == 200)
+    status_counts: dict[str, int] = {}
+    for _, status in samples:
+        status_counts[str(status)] = status_counts.get(str(status), 0) + 1
+
+    errors = total - len(ok_latencies)
+    server_errors = sum(c for s, c in status_counts.items() if s.startswith("5"))
+
+    def rate(count: int) -> float:
+        return round(count / total, 4) if total else 0.0
+
+    return {
+        "config": {
+            "url": args.url,
+            "mode": args.mode,
+            "users": args.users if args.mode == "closed" else None,
+            "rate": args.rate if args.mode == "open" else None,
+            "duration": args.duration,
+            "distinct": args.distinct,
+        },
+        "requests": total,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(ok_latencies) / elapsed, 3) if elapsed else 0.0,
+        "error_rate": rate(errors),
+        # web_app answers 504 when a request times out (ASK_TIMEOUT_SECONDS);
+        # 503 is kept for servers/proxies in front of it that shed load
+        "rate_5xx": rate(server_errors),
+        "rate_503": rate(status_counts.get("503", 0)),
+        "rate_504": rate(status_counts.get("504", 0)),
+        "rate_conn_error": rate(status_counts.get("0", 0)),
+        "status_counts": status_counts,
+        "latency_ms": {
+            **{f"p{p}": round(_percentile(ok_latencies, p) * 1000, 1) for p in PERCENTILES},
+            "mean": round(sum(ok_latencies) / len(ok_latencies) * 1000, 1) if ok_latencies else 0.0,
+            "max": round(ok_latencies[-1] * 1000, 1) if ok_latencies else 0.0,
+        },
+    }
+
+
+def _print_report(report: dict) -> None:
+    cfg = report["config"]
+    load = f"{cfg['users']} users" if cfg["mode"] == "closed" else f"{cfg['rate']} req/s"
+    print(f"\n=== {cfg['mode']}-loop, {load}, {cfg['duration']}s against {cfg['url']} ===")
+    print(f"requests      : {report['requests']}")
+    print(f"throughput    : {report['throughput_rps']} req/s (successful)")
+    print(f"error rate    : {report['error_rate']:.2%}   5xx: {report['rate_5xx']:.2%} "
+          f"(503: {report['rate_503']:.2%}, 504 timeout: {report['rate_504']:.2%})   "
+          f"connection errors: {report['rate_conn_error']:.2%}")
+    print(f"status counts : {report['status_counts']}")
+    lat = report["latency_ms"]
+    print("latency (ms)  : " + "  ".join(f"{k}={v}" for k, v in lat.items()))
+
+
+def run(args: argparse.Namespace) -> None:
+    rec = _Recorder()
+    start = time.monotonic()
+    if args.mode == "closed":
+        _run_closed(args, rec)
+    else:
+        _run_open(args, rec)
+    report = _summarise(args, rec, time.monotonic() - start)
+    _print_report(report)
+    if report["requests"] and report["rate_conn_error"] == 1.0:
+        print(f"\n[loadtest] WARNING: every request failed to connect — is {args.url} running?")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n[loadtest] Report saved to {args.out}")
+
+
+# --------------------------------------------------------------------------- #
+# Compare two saved reports
+# --------------------------------------------------------------------------- #
+
+def compare(args: argparse.Namespace) -> None:
+    with open(args.baseline, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        cand = json.load(f)
+
+    rows = [
+        ("throughput_rps", base["throughput_rps"], cand["throughput_rps"]),
+        ("error_rate", base["error_rate"], cand["error_rate"]),
+        ("rate_5xx", base.get("rate_5xx", 0.0), cand.get("rate_5xx", 0.0)),
+        ("rate_503", base["rate_503"], cand["rate_503"]),
+        ("rate_504", base.get("rate_504", 0.0), cand.get("rate_504", 0.0)),
+        ("rate_conn_error", base.get("rate_conn_error", 0.0), cand.get("rate_conn_error", 0.0)),
+    ]
+    rows += [
+        (f"latency {k} ms", base["latency_ms"][k], cand["latency_ms"][k])
+        for k in base["latency_ms"]
+    ]
+
+    print(f"{'metric':<18}{'baseline':>12}{'candidate':>12}{'change':>10}")
+    for name, b, c in rows:
+        change = f"{(c - b) / b:+.1%}" if b else "n/a"
+        print(f"{name:<18}{b:>12}{c:>12}{change:>10}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test the Islamic Finance AI web app")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    fake = sub.add_parser("serve-fake", help="Run web_app with fake, fixed-latency backends")
+    fake.add_argument("--port", type=int, default=5001)
+    fake.add_argument("--embed-ms", type=float, default=40)
+    fake.add_argument("--qdrant-ms", type=float, default=30)
+    fake.add_argument("--web-ms", type=float, default=1500)
+    fake.add_argument("--llm-ms", type=float, default=2500)
+    fake.add_argument("--jitter", type=float, default=0.3,
+                      help="Uniform ± fraction applied to each fake latency")
+    fake.add_argument("--score", type=float, default=0.5,
+                      help="Similarity score of fake Qdrant hits (drives web-search gating)")
+
+    load = sub.add_parser("run", help="Generate load against /ask")
+    load.add_argument("--url", default="http://localhost:5001")
+    load.add_argument("--mode", choices=["closed", "open"], default="closed")
+    load.add_argument("--users", type=int, default=10, help="Concurrent users (closed mode)")
+    load.add_argument("--rate", type=float, default=5.0, help="Requests per second (open mode)")
+    load.add_argument("--max-inflight", type=int, default=256,
+                      help="Client-side cap on concurrent requests (open mode)")
+    load.add_argument("--duration", type=float, default=30.0, help="Seconds of load")
+    load.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout")
+    load.add_argument("--error-backoff", type=float, default=0.5,
+                      help="Initial pause after a connection error (closed mode)")
+    load.add_argument("--distinct", action="store_true",
+                      help="Make every question unique so requests are not coalesced")
+    load.add_argument("--out", help="Save the JSON report to this path")
+
+    cmp_ = sub.add_parser("compare", help="Compare two saved reports")
+    cmp_.add_argument("baseline")
+    cmp_.add_argument("candidate")
+
+    args = parser.parse_args()
+    if args.command == "serve-fake":
+        serve_fake(args)
+    elif args.command == "run":
+        run(args)
+    else:
+        compare(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,41 @@
 """
 pipeline.py — Orchestrates ingestion and query answering.
 
-Two public functions:
-  ingest(data_dir)  : run once to load, chunk, embed, and store documents
-  ask(question)     : run on every user question to retrieve and generate an answer
+Public functions:
+  ingest(data_dir)          : run once to load, chunk, embed, and store documents
+  ask(question)             : run on every user question to retrieve and generate an answer
+  export_snapshot(out_dir)  : save the collection's vectors + payloads locally
+  import_snapshot(in_dir)   : rebuild the collection from a snapshot, no re-embedding
 """
 
 import sys
 import os
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 
 # Allow imports from the project root
 sys.path.insert(0, os.path.dirname(__file__))
 
 from src.ingestion.loader import load_documents
 from src.ingestion.chunker import chunk_documents
+from src.ingestion.dedup import deduplicate_chunks
 from src.ingestion.embedder import embed_and_upload
+from src.ingestion.snapshot import export_snapshot, import_snapshot
 from src.retrieval.retriever import retrieve
 from src.retrieval.web_search import search_scholar_web
 from src.generation.generator import generate_answer
+from src.serving.tracing import span
+from config import (
+    DEDUP_ENABLED,
+    WEB_SEARCH_SKIP_SCORE,
+    WEB_SEARCH_MIN_COVERAGE,
+    WEB_SEARCH_COVERAGE_SOURCES,
+    WEB_SEARCH_TIMEOUT_SECONDS,
+    WEB_SEARCH_HEDGE,
+    WEB_SEARCH_MAX_WORKERS,
+)
 
 _SCHOLAR_FATWA_KEYWORDS = [
     "fatwa", "fatwas", "scholar", "scholars", "opinion", "ruling", "rulings",
@@ -33,9 +51,52 @@ def _is_scholar_fatwa_question(question: str) -> bool:
     return any(kw in q_lower for kw in _SCHOLAR_FATWA_KEYWORDS)
 
 
+# Tavily runs on these threads so its latency can be bounded (and overlapped
+# with Qdrant retrieval). The Tavily HTTP call has its own timeout, so a
+# running search frees its thread within about the same budget; a search
+# still queued when the caller gives up is cancelled and never runs.
+_web_executor = ThreadPoolExecutor(max_workers=WEB_SEARCH_MAX_WORKERS, thread_name_prefix="web_search")
+
+_web_stats_lock = threading.Lock()
+# skipped   : gate passed before any search was started (no Tavily call)
+# discarded : gate passed but a hedged search was already running (Tavily still billed)
+# queued_out: budget ran out while the search was still waiting for a free thread
+#             (pool too small — raise WEB_SEARCH_MAX_WORKERS; Tavily never called)
+# timed_out : Tavily itself was slower than the budget
+_web_stats = {
+    "skipped": 0, "discarded": 0, "queued_out": 0, "timed_out": 0, "used": 0, "empty": 0,
+}
+
+
+def _count_web(outcome: str) -> None:
+    with _web_stats_lock:
+        _web_stats[outcome] += 1
+
+
+def web_search_stats() -> dict:
+    """Return how often the fatwa path skipped, discarded, timed out, or used web search."""
+    with _web_stats_lock:
+        return dict(_web_stats)
+
+
+def _submit_web_search(question: str):
+    # copy_context() carries the active trace onto the worker thread
+    return _web_executor.submit(contextvars.copy_context().run, search_scholar_web, question)
+
+
+def _has_strong_coverage(chunks: list[dict]) -> bool:
+    """True if enough scholar/AAOIFI chunks already score above the skip threshold."""
+    strong = [
+        c for c in chunks
+        if c["source_type"] in WEB_SEARCH_COVERAGE_SOURCES
+        and c["score"] >= WEB_SEARCH_SKIP_SCORE
+    ]
+    return len(strong) >= WEB_SEARCH_MIN_COVERAGE
+
+
 def ingest(data_dir: str = "data/raw") -> None:
     """
-    Full ingestion pipeline: load → chunk → embed → upload to Qdrant.
+    Full ingestion pipeline: load → chunk → dedup → embed → upload to Qdrant.
 
     Run this once after adding or updating documents.
 
@@ -52,6 +113,8 @@ def ingest(data_dir: str = "data/raw") -> None:
         return
 
     chunks = chunk_documents(documents)
+    if DEDUP_ENABLED:
+        chunks = deduplicate_chunks(chunks)
     embed_and_upload(chunks)
     print("=== INGESTION COMPLETE ===\n")
 
@@ -61,7 +124,10 @@ def ask(question: str) -> str:
     Query pipeline: retrieve relevant chunks → generate answer with citations.
 
     If the question is about scholar opinions or fatwas, also searches Tavily
-    across trusted Islamic scholar domains and combines results with Qdrant.
+    across trusted Islamic scholar domains and combines results with Qdrant —
+    unless Qdrant already returned strong scholar/AAOIFI passages. The web
+    search gets at most WEB_SEARCH_TIMEOUT_SECONDS; a slower search is dropped
+    and the answer is generated from Qdrant results alone.
 
     Args:
         question : the user's question
@@ -69,12 +135,49 @@ def ask(question: str) -> str:
     Returns:
         Answer string with inline citations.
     """
-    chunks = retrieve(question)
-
-    if _is_scholar_fatwa_question(question):
-        print("[pipeline] Scholar/fatwa question detected — adding web search")
-        web_chunks = search_scholar_web(question)
-        chunks = chunks + web_chunks
-
-    answer = generate_answer(question, chunks)
+    web_future = None
+    web_started = 0.0
+    with span("routing") as s:
+        is_fatwa = _is_scholar_fatwa_question(question)
+        s.set(scholar_fatwa=is_fatwa)
+
+    if is_fatwa and WEB_SEARCH_HEDGE:
+        web_started = time.monotonic()
+        web_future = _submit_web_search(question)
+
+    with span("retrieve") as s:
+        chunks = retrieve(question)
+        s.set(chunks=len(chunks))
+
+    if is_fatwa:
+        if _has_strong_coverage(chunks):
+            print("[pipeline] Scholar/fatwa question — Qdrant coverage is strong, skipping web search")
+            # cancel() only succeeds while the hedged search is still queued
+            if web_future is not None and not web_future.cancel():
+                _count_web("discarded")
+            else:
+                _count_web("skipped")
+        else:
+            print("[pipeline] Scholar/fatwa question detected — adding web search")
+            if web_future is None:
+                web_started = time.monotonic()
+                web_future = _submit_web_search(question)
+            remaining = WEB_SEARCH_TIMEOUT_SECONDS - (time.monotonic() - web_started)
+            with span("web_search_wait", budget_s=round(max(remaining, 0.0), 3)) as s:
+                try:
+                    web_chunks = web_future.result(timeout=max(remaining, 0.0))
+                except FutureTimeout:
+                    # cancel() succeeds only if the search never left the queue
+                    outcome = "queued_out" if web_future.cancel() else "timed_out"
+                    print(f"[pipeline] Web search exceeded {WEB_SEARCH_TIMEOUT_SECONDS}s "
+                          f"({outcome}) — answering without it")
+                    _count_web(outcome)
+                    s.set(outcome=outcome)
+                else:
+                    _count_web("used" if web_chunks else "empty")
+                    s.set(outcome="used" if web_chunks else "empty")
+                    chunks = chunks + web_chunks
+
+    with span("generate"):
+        answer = generate_answer(question, chunks)
     return answer
@@ -15,6 +15,7 @@ The model is instructed to:
 
 from openai import OpenAI
 from config import OPENAI_API_KEY, CHAT_MODEL
+from src.serving.tracing import span
 
 _client = OpenAI(api_key=OPENAI_API_KEY)
 
@@ -80,6 +81,10 @@ def _build_context_block(retrieved_chunks: list[dict]) -> str:
             source_label = f"Quran — Surah {chunk['surah']}, Ayah {chunk['ayah']}"
         else:
             source_label = f"{chunk['source_type'].upper()} — {chunk['filename']}"
+            # Merged duplicates: list the other files the same passage appears in
+            others = [f for f in (chunk.get("filenames") or []) if f != chunk["filename"]]
+            if others:
+                source_label += f" (also in: {', '.join(others)})"
         lines.append(f"[{i}] {source_label}\n{chunk['text']}\n")
     return "\n".join(lines)
 
@@ -108,7 +113,9 @@ def generate_answer(question: str, retrieved_chunks: list[dict]) -> str:
             "I could not find relevant information in my sources to answer this question."
         )
 
-    context_block = _build_context_block(retrieved_chunks)
+    with span("context_build", chunks=len(retrieved_chunks)) as s:
+        context_block = _build_context_block(retrieved_chunks)
+        s.set(chars=len(context_block))
 
     user_message = f"""CONTEXT PASSAGES:
 {context_block}
@@ -117,14 +124,20 @@ QUESTION: {question}
 
 Answer the question using only the context passages above. Cite every claim."""
 
-    response = _client.chat.completions.create(
-        model=CHAT_MODEL,
-        messages=[
-            {"role": "system", "content": _SYSTEM_PROMPT},
-            {"role": "user", "content": user_message},
-        ],
-        temperature=0.0,   # Deterministic — no creative hallucination
-        max_tokens=1024,
-    )
+    with span("llm_call", model=CHAT_MODEL) as s:
+        response = _client.chat.completions.create(
+            model=CHAT_MODEL,
+            messages=[
+                {"role": "system", "content": _SYSTEM_PROMPT},
+                {"role": "user", "content": user_message},
+            ],
+            temperature=0.0,   # Deterministic — no creative hallucination
+            max_tokens=1024,
+        )
+        if response.usage is not None:
+            s.set(
+                prompt_tokens=response.usage.prompt_tokens,
+                completion_tokens=response.usage.completion_tokens,
+            )
 
     return response.choices[0].message.content.strip()
@@ -0,0 +1,122 @@
+"""
+dedup.py — Collapse near-duplicate chunks before they are embedded.
+
+The same hadith appears in several collections and the same fatwa is often
+republished across PDFs. Embedding every copy costs money, bloats the index,
+and fills retrieve() results with the same passage several times.
+
+Method (MinHash + LSH):
+  1. Shingle each chunk into overlapping word n-grams (DEDUP_SHINGLE_SIZE words).
+  2. Build a DEDUP_NUM_PERM-value MinHash signature with vectorised NumPy hashing.
+  3. Split the signature into DEDUP_BANDS bands; chunks sharing any band bucket
+     (within the same source_type) become candidates.
+  4. A candidate is a duplicate if its estimated Jaccard similarity with an
+     already-kept chunk is >= DEDUP_THRESHOLD.
+
+Duplicates are dropped; the kept chunk gains a "filenames" list naming every
+file the passage appeared in, so answers can still cite all sources.
+
+Quran chunks are never deduplicated: identical ayah text in different surahs
+(e.g. the refrain of Surah Ar-Rahman) must keep its own surah/ayah citation.
+"""
+
+import re
+import zlib
+
+import numpy as np
+
+from config import (
+    DEDUP_SOURCE_TYPES,
+    DEDUP_THRESHOLD,
+    DEDUP_NUM_PERM,
+    DEDUP_BANDS,
+    DEDUP_SHINGLE_SIZE,
+)
+from src.ingestion.chunker import _tokenize
+
+_MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+_WORD = re.compile(r"\w+")
+
+# Fixed seed so signatures are reproducible between runs
+_rng = np.random.default_rng(1)
+_A = _rng.integers(1, (1 << 31) - 1, size=DEDUP_NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, (1 << 31) - 1, size=DEDUP_NUM_PERM, dtype=np.uint64)
+
+
+def _shingles(text: str) -> np.ndarray:
+    """Hash each word n-gram of the normalised text to a 32-bit integer."""
+    words = _WORD.findall(text.lower())
+    n = DEDUP_SHINGLE_SIZE
+    if len(words) <= n:
+        grams = [" ".join(words)]
+    else:
+        grams = [" ".join(words[i : i + n]) for i in range(len(words) - n + 1)]
+    hashes = {zlib.crc32(g.encode("utf-8")) for g in grams}
+    return np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+
+
+def _minhash(shingles: np.ndarray) -> np.ndarray:
+    """
+    MinHash signature: for each of NUM_PERM hash functions (a*x + b) mod p,
+    the minimum over all shingles. a, x < 2^32 so a*x fits in uint64.
+    """
+    hashed = (np.outer(shingles, _A) + _B) % _MERSENNE_PRIME   # (n_shingles, NUM_PERM)
+    return hashed.min(axis=0)
+
+
+def deduplicate_chunks(chunks: list[dict]) -> list[dict]:
+    """
+    Drop near-duplicate chunks, keeping the first occurrence of each passage.
+
+    Args:
+        chunks : chunk dicts from chunk_documents()
+
+    Returns:
+        A new list with duplicates removed. Kept chunks that absorbed
+        duplicates carry metadata["filenames"] listing every source file.
+    """
+    rows = DEDUP_NUM_PERM // DEDUP_BANDS
+    buckets: dict[tuple, list[int]] = {}   # (source_type, band, band_hash) → kept indices
+    signatures: list[np.ndarray | None] = []
+    kept: list[dict] = []
+    dropped_tokens = 0
+
+    for chunk in chunks:
+        source_type = chunk["metadata"].get("source_type")
+        if source_type not in DEDUP_SOURCE_TYPES:
+            kept.append(chunk)
+            signatures.append(None)
+            continue
+
+        sig = _minhash(_shingles(chunk["text"]))
+        band_keys = [
+            (source_type, b, sig[b * rows : (b + 1) * rows].tobytes())
+            for b in range(DEDUP_BANDS)
+        ]
+
+        candidates = {i for key in band_keys for i in buckets.get(key, [])}
+        match = None
+        best = DEDUP_THRESHOLD
+        for i in candidates:
+            similarity = float(np.mean(signatures[i] == sig))
+            if similarity >= best:
+                match, best = i, similarity
+
+        if match is not None:
+            meta = kept[match]["metadata"]
+            filenames = meta.setdefault("filenames", [meta["filename"]])
+            if chunk["metadata"]["filename"] not in filenames:
+                filenames.append(chunk["metadata"]["filename"])
+            dropped_tokens += len(_tokenize(chunk["text"]))
+            continue
+
+        idx = len(kept)
+        kept.append({"text": chunk["text"], "metadata": dict(chunk["metadata"])})
+        signatures.append(sig)
+        for key in band_keys:
+            buckets.setdefault(key, []).append(idx)
+
+    removed = len(chunks) - len(kept)
+    print(f"[dedup] {len(chunks)} chunks → {len(kept)} "
+          f"({removed} near-duplicates removed, ~{dropped_tokens} embedding tokens saved)")
+    return kept
@@ -22,7 +22,9 @@ from config import (
     QDRANT_PORT,
     QDRANT_API_KEY,
     COLLECTION_NAME,
+    DOCSTORE_ENABLED,
 )
+from src.retrieval.docstore import DocStore, slim_payload
 
 EMBEDDING_DIM = 1536   # text-embedding-3-small output size
 BATCH_SIZE = 100
@@ -62,9 +64,13 @@ def embed_and_upload(chunks: list[dict]) -> None:
     Each Qdrant point stores:
       vector  : the embedding
       payload : the chunk text + metadata (used for citation in answers)
+
+    With DOCSTORE_ENABLED the full payload goes to the local docstore and
+    Qdrant only keeps the slim filterable fields.
     """
     openai, qdrant = _get_clients()
     _ensure_collection(qdrant)
+    docstore = DocStore() if DOCSTORE_ENABLED else None
 
     total = len(chunks)
     uploaded = 0
@@ -75,16 +81,17 @@ def embed_and_upload(chunks: list[dict]) -> None:
 
         vectors = _embed_batch(openai, texts)
 
+        ids = [str(uuid.uuid4()) for _ in batch]
+        payloads = [{"text": chunk["text"], **chunk["metadata"]} for chunk in batch]
+
+        if docstore is not None:
+            # Write text locally first so a Qdrant point never lacks its document
+            docstore.put_many(list(zip(ids, payloads)))
+            payloads = [slim_payload(p) for p in payloads]
+
         points = [
-            PointStruct(
-                id=str(uuid.uuid4()),
-                vector=vector,
-                payload={
-                    "text": chunk["text"],
-                    **chunk["metadata"],
-                },
-            )
-            for chunk, vector in zip(batch, vectors)
+            PointStruct(id=point_id, vector=vector, payload=payload)
+            for point_id, vector, payload in zip(ids, vectors, payloads)
         ]
 
         qdrant.upsert(collection_name=COLLECTION_NAME, points=points)
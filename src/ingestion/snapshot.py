@@ -0,0 +1,163 @@
+"""
+snapshot.py — Export a Qdrant collection to local files and restore it later.
+
+Re-running ingest() re-embeds the whole corpus with OpenAI. A snapshot keeps the
+vectors we already paid for, so moving to a new cluster or recovering a lost
+collection is just local I/O plus a bulk upload — zero OpenAI calls.
+
+Snapshot layout (one directory):
+  manifest.json   : collection name, dimension, dtype, point count
+  vectors.npy     : (count, dim) float32 or float16 array, row i = point i
+  payloads.jsonl  : one {"id": ..., "payload": {...}} line per point, same order
+
+float16 halves the file size; cosine ranking is practically unaffected because
+Qdrant re-normalises vectors on upload.
+
+With DOCSTORE_ENABLED, export merges the docstore's full payloads into
+payloads.jsonl and import splits them again, so a snapshot is always complete.
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+from qdrant_client import QdrantClient
+
+from config import COLLECTION_NAME, SNAPSHOT_UPLOAD_PARALLEL, DOCSTORE_ENABLED
+from src.ingestion.embedder import EMBEDDING_DIM, _get_clients, _ensure_collection
+from src.retrieval.docstore import DocStore, slim_payload
+
+SCROLL_BATCH = 512
+UPLOAD_BATCH = 256
+
+_MANIFEST = "manifest.json"
+_VECTORS = "vectors.npy"
+_PAYLOADS = "payloads.jsonl"
+
+
+def _collection_dim(qdrant: QdrantClient) -> int:
+    info = qdrant.get_collection(COLLECTION_NAME)
+    return info.config.params.vectors.size
+
+
+def export_snapshot(out_dir: str, dtype: str = "float32") -> None:
+    """
+    Write every point of the collection (vector + payload) to out_dir.
+
+    Vectors are streamed into a memory-mapped .npy file, so the full corpus
+    never has to fit in RAM.
+
+    Args:
+        out_dir : destination directory (created if missing)
+        dtype   : "float32" (exact) or "float16" (half the size)
+    """
+    if dtype not in {"float32", "float16"}:
+        raise ValueError(f"Unsupported snapshot dtype: {dtype}")
+
+    _, qdrant = _get_clients()
+    dim = _collection_dim(qdrant)
+    expected = qdrant.count(collection_name=COLLECTION_NAME, exact=True).count
+
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    vectors = np.lib.format.open_memmap(
+        out / _VECTORS, mode="w+", dtype=dtype, shape=(expected, dim)
+    )
+
+    docstore = DocStore() if DOCSTORE_ENABLED else None
+    written = 0
+    offset = None
+    with (out / _PAYLOADS).open("w", encoding="utf-8") as f:
+        while True:
+            points, offset = qdrant.scroll(
+                collection_name=COLLECTION_NAME,
+                limit=SCROLL_BATCH,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+            # Points added after count() was taken don't fit the array; skip them
+            points = points[: expected - written]
+            if points:
+                vectors[written : written + len(points)] = [p.vector for p in points]
+                docs = docstore.get_many([str(p.id) for p in points]) if docstore else {}
+                for p in points:
+                    payload = docs.get(str(p.id)) or p.payload or {}
+                    f.write(json.dumps({"id": p.id, "payload": payload}, ensure_ascii=False))
+                    f.write("\n")
+                written += len(points)
+                print(f"[snapshot] Exported {written}/{expected} points")
+            if offset is None or written >= expected:
+                break
+
+    vectors.flush()
+    del vectors
+
+    manifest = {
+        "collection": COLLECTION_NAME,
+        "dim": dim,
+        "dtype": dtype,
+        "count": written,
+    }
+    (out / _MANIFEST).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    print(f"[snapshot] Done. {written} points written to '{out}' ({dtype})")
+
+
+def _iter_vectors(vectors: np.ndarray):
+    """Yield rows as float32 lists, converting one block at a time."""
+    for start in range(0, len(vectors), UPLOAD_BATCH):
+        block = np.asarray(vectors[start : start + UPLOAD_BATCH], dtype=np.float32)
+        yield from block.tolist()
+
+
+def import_snapshot(in_dir: str) -> None:
+    """
+    Restore a snapshot written by export_snapshot() into COLLECTION_NAME.
+
+    Creates the collection if needed and bulk-uploads with the client's
+    parallel upload path. Existing points with the same IDs are overwritten.
+
+    Args:
+        in_dir : directory containing manifest.json, vectors.npy, payloads.jsonl
+    """
+    src = Path(in_dir)
+    manifest = json.loads((src / _MANIFEST).read_text(encoding="utf-8"))
+    if manifest["dim"] != EMBEDDING_DIM:
+        raise ValueError(
+            f"Snapshot dimension {manifest['dim']} does not match "
+            f"EMBEDDING_DIM {EMBEDDING_DIM}"
+        )
+
+    count = manifest["count"]
+    vectors = np.load(src / _VECTORS, mmap_mode="r")[:count]
+
+    ids, payloads = [], []
+    with (src / _PAYLOADS).open(encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            ids.append(record["id"])
+            payloads.append(record["payload"])
+
+    if len(ids) != count:
+        raise ValueError(f"Snapshot has {count} vectors but {len(ids)} payloads")
+
+    if DOCSTORE_ENABLED:
+        DocStore().put_many(list(zip(ids, payloads)))
+        payloads = [slim_payload(p) for p in payloads]
+        print(f"[snapshot] Wrote {count} documents to the local docstore")
+
+    _, qdrant = _get_clients()
+    _ensure_collection(qdrant)
+
+    print(f"[snapshot] Uploading {count} points from '{src}' "
+          f"(parallel={SNAPSHOT_UPLOAD_PARALLEL})")
+    qdrant.upload_collection(
+        collection_name=COLLECTION_NAME,
+        vectors=_iter_vectors(vectors),
+        payload=payloads,
+        ids=ids,
+        batch_size=UPLOAD_BATCH,
+        parallel=SNAPSHOT_UPLOAD_PARALLEL,
+        wait=True,
+    )
+    print(f"[snapshot] Done. {count} points restored into '{COLLECTION_NAME}'")
@@ -0,0 +1,73 @@
+"""
+docstore.py — Local SQLite store for chunk text and metadata, keyed by point ID.
+
+With DOCSTORE_ENABLED, Qdrant points carry only the small filterable fields
+(SLIM_FIELDS) and the full payload — chunk text included — lives here. That
+roughly halves collection size and the bytes every query pulls over the network;
+retrieve() then reads all texts for its hits in one local SELECT.
+
+SQLite is opened with a large mmap_size, so hot pages are served straight from
+the OS page cache. Each thread gets its own connection (Flask serves requests
+on multiple threads).
+
+The docstore file must travel with the collection: copy it alongside, or use
+app.py --export-snapshot, which folds the docstore back into payloads.jsonl.
+"""
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+from config import DOCSTORE_PATH
+
+# Payload fields kept in Qdrant for filtering and cheap display
+SLIM_FIELDS = ("source_type", "filename", "chunk_index", "surah", "ayah")
+
+_MMAP_BYTES = 1 << 30
+
+
+def slim_payload(payload: dict) -> dict:
+    """Return the subset of a payload that stays in Qdrant."""
+    return {k: payload[k] for k in SLIM_FIELDS if k in payload}
+
+
+class DocStore:
+    """Point ID → full payload dict, backed by a single SQLite file."""
+
+    def __init__(self, path: str = DOCSTORE_PATH) -> None:
+        self._path = path
+        self._local = threading.local()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS docs (id TEXT PRIMARY KEY, payload TEXT NOT NULL)")
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path)
+            conn.execute(f"PRAGMA mmap_size={_MMAP_BYTES}")
+            self._local.conn = conn
+        return conn
+
+    def put_many(self, records: list[tuple[str, dict]]) -> None:
+        """Insert or replace (point_id, payload) pairs in one transaction."""
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO docs (id, payload) VALUES (?, ?)",
+                [(str(pid), json.dumps(payload, ensure_ascii=False)) for pid, payload in records],
+            )
+
+    def get_many(self, ids: list[str]) -> dict[str, dict]:
+        """Fetch payloads for many point IDs in a single query. Missing IDs are omitted."""
+        if not ids:
+            return {}
+        placeholders = ",".join("?" * len(ids))
+        rows = self._conn().execute(
+            f"SELECT id, payload FROM docs WHERE id IN ({placeholders})",
+            [str(i) for i in ids],
+        ).fetchall()
+        return {pid: json.loads(payload) for pid, payload in rows}
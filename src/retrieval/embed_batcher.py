@@ -0,0 +1,159 @@
+"""
+embed_batcher.py — Merge concurrent query embeddings into one OpenAI request.
+
+Under load every /ask request would embed its question with its own
+embeddings.create() round-trip. The batcher instead queues each query,
+waits up to EMBED_BATCH_WINDOW_MS after the first one arrives (or until
+EMBED_BATCH_MAX queries are waiting), and embeds the whole batch at once.
+Each caller blocks only for its own vector.
+
+  - At most `senders` requests are in flight. When all are busy the collector
+    keeps the batch open and, as soon as one frees up, sends everything queued
+    so far (up to max_batch). Batches therefore grow with load instead of
+    piling up as many tiny requests waiting for a sender.
+  - Identical texts in a batch are embedded once.
+  - If the API call (or anything after it) fails, every caller in that batch
+    gets the exception; a caller never waits longer than timeout_s.
+
+A lone request pays at most one window (a few milliseconds) of extra latency.
+Run bench_embed_batcher.py to see batch size and latency under load.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from openai import OpenAI
+
+
+class EmbeddingBatcher:
+    """Collects embed() calls from many threads and sends them in batches."""
+
+    def __init__(
+        self,
+        client: OpenAI,
+        model: str,
+        window_ms: float,
+        max_batch: int,
+        timeout_s: float,
+        senders: int = 4,
+    ) -> None:
+        self._client = client
+        self._model = model
+        self._window = window_ms / 1000
+        self._max_batch = max_batch
+        self._timeout = timeout_s
+        self._queue: queue.Queue[tuple[str, Future]] = queue.Queue()
+        self._senders = ThreadPoolExecutor(max_workers=senders, thread_name_prefix="embed_batch")
+        # One slot per sender thread; the collector only dispatches into a free slot
+        self._free_senders = threading.Semaphore(senders)
+        self._worker: threading.Thread | None = None
+        self._worker_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.queries = 0
+        self.batches = 0
+
+    def embed(self, text: str) -> tuple[list[float], dict]:
+        """
+        Return the embedding for text, sharing an API call with concurrent callers.
+
+        Returns:
+            (vector, usage) where usage has the batch_size and batch_tokens of
+            the shared request (tokens are for the whole batch, not this query).
+
+        Raises:
+            TimeoutError : no result within timeout_s
+            Exception    : whatever the embedding request raised
+        """
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future.result(timeout=self._timeout)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "queries": self.queries,
+                "batches": self.batches,
+                "avg_batch": round(self.queries / self.batches, 2) if self.batches else 0.0,
+            }
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._collect, daemon=True)
+                self._worker.start()
+
+    def _collect(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            slot_held = False
+            try:
+                deadline = time.monotonic() + self._window
+                while len(batch) < self._max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(self._queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+
+                # Wait for a free sender, then sweep in everything that queued meanwhile
+                self._free_senders.acquire()
+                slot_held = True
+                while len(batch) < self._max_batch:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                self._senders.submit(self._send, batch)
+            except Exception as e:
+                # Never let one failure kill the collector: fail this batch, keep serving
+                print(f"[embed_batcher] Could not dispatch batch: {e}")
+                if slot_held:
+                    self._free_senders.release()
+                _fail(batch, e)
+
+    def _send(self, batch: list[tuple[str, Future]]) -> None:
+        try:
+            self._embed_batch(batch)
+        finally:
+            self._free_senders.release()
+
+    def _embed_batch(self, batch: list[tuple[str, Future]]) -> None:
+        try:
+            texts = list(dict.fromkeys(text for text, _ in batch))
+            response = self._client.embeddings.create(model=self._model, input=texts)
+            if len(response.data) != len(texts):
+                raise RuntimeError(
+                    f"Embedding API returned {len(response.data)} vectors for {len(texts)} inputs"
+                )
+
+            data = sorted(response.data, key=lambda item: item.index)
+            by_text = {text: item.embedding for text, item in zip(texts, data)}
+            usage = {
+                "batch_size": len(batch),
+                "batch_tokens": response.usage.total_tokens if response.usage is not None else None,
+            }
+
+            with self._stats_lock:
+                self.queries += len(batch)
+                self.batches += 1
+
+            for text, future in batch:
+                if not future.done():
+                    future.set_result((by_text[text], usage))
+        except Exception as e:
+            _fail(batch, e)
+
+
+def _fail(batch: list[tuple[str, Future]], error: Exception) -> None:
+    """Resolve every still-pending future in the batch with error."""
+    for _, future in batch:
+        if not future.done():
+            future.set_exception(error)
@@ -8,11 +8,32 @@ Each result has:
   source_type : quran | hadith | scholar | aaoifi
   filename    : source file name
   chunk_index : position within the original document
+  filenames   : every file containing this passage (None unless duplicates were merged)
+
+Query embedding (config.EMBED_BATCH_ENABLED):
+  Concurrent calls are merged into one embeddings request by EmbeddingBatcher.
+
+Optional external docstore (config.DOCSTORE_ENABLED):
+  Qdrant payloads hold only filterable fields; texts for all hits are read
+  from the local docstore in one batched query. Hits found in neither the
+  docstore nor the Qdrant payload are dropped and counted (docstore_stats()).
+
+Optional MMR re-ranking (config.MMR_ENABLED):
+  Fetch MMR_FETCH_K candidates with their vectors (no payloads), greedily pick
+  top_k chunks that are relevant to the query but not redundant with each
+  other, then fetch payloads for just those top_k IDs. score is still the
+  original cosine similarity to the query.
 """
 
+import threading
+
+import numpy as np
 from openai import OpenAI
 from qdrant_client import QdrantClient
 
+from src.serving.tracing import span
+from src.retrieval.docstore import DocStore
+from src.retrieval.embed_batcher import EmbeddingBatcher
 from config import (
     OPENAI_API_KEY,
     EMBEDDING_MODEL,
@@ -22,6 +43,16 @@ from config import (
     QDRANT_API_KEY,
     COLLECTION_NAME,
     TOP_K,
+    MMR_ENABLED,
+    MMR_LAMBDA,
+    MMR_FETCH_K,
+    DOCSTORE_ENABLED,
+    DOCSTORE_PATH,
+    EMBED_BATCH_ENABLED,
+    EMBED_BATCH_WINDOW_MS,
+    EMBED_BATCH_MAX,
+    EMBED_BATCH_TIMEOUT_SECONDS,
+    EMBED_BATCH_SENDERS,
 )
 
 _openai = OpenAI(api_key=OPENAI_API_KEY)
@@ -29,41 +60,177 @@ if QDRANT_URL:
     _qdrant = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
 else:
     _qdrant = QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT, api_key=QDRANT_API_KEY)
+_docstore = DocStore() if DOCSTORE_ENABLED else None
+_docstore_misses = 0
+_docstore_lock = threading.Lock()
+_batcher = (
+    EmbeddingBatcher(
+        _openai,
+        EMBEDDING_MODEL,
+        EMBED_BATCH_WINDOW_MS,
+        EMBED_BATCH_MAX,
+        EMBED_BATCH_TIMEOUT_SECONDS,
+        EMBED_BATCH_SENDERS,
+    )
+    if EMBED_BATCH_ENABLED else None
+)
+
+
+def _record_docstore_misses(count: int) -> None:
+    global _docstore_misses
+    with _docstore_lock:
+        _docstore_misses += count
+
+
+def docstore_stats() -> dict:
+    """Hits dropped because their text was in neither the docstore nor Qdrant."""
+    with _docstore_lock:
+        return {"enabled": DOCSTORE_ENABLED, "misses": _docstore_misses}
+
+
+def embedding_batch_stats() -> dict:
+    """Queries embedded vs. API batches sent (empty when batching is off)."""
+    return _batcher.stats() if _batcher is not None else {}
+
+
+def _mmr_select(
+    query_vector: list[float],
+    candidate_vectors: list[list[float]],
+    k: int,
+    lambda_mult: float,
+) -> list[int]:
+    """
+    Maximal Marginal Relevance over a candidate pool.
 
+    Each step picks the candidate maximising
+        lambda * sim(query, c) - (1 - lambda) * max(sim(c, already_selected))
 
-def retrieve(query: str, top_k: int = TOP_K) -> list[dict]:
+    Similarities are computed once as two matrix products, so the greedy loop
+    only does O(n) vector ops per pick — a pool of a few dozen 1536-d vectors
+    takes well under a millisecond.
+
+    Returns:
+        Indices into candidate_vectors in selection order.
+    """
+    cands = np.asarray(candidate_vectors, dtype=np.float32)
+    if cands.shape[0] == 0 or k <= 0:
+        return []
+
+    query = np.asarray(query_vector, dtype=np.float32)
+    query /= np.linalg.norm(query) or 1.0
+    norms = np.linalg.norm(cands, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    cands /= norms
+
+    relevance = cands @ query           # (n,)
+    pairwise = cands @ cands.T          # (n, n)
+
+    k = min(k, cands.shape[0])
+    first = int(np.argmax(relevance))
+    selected = [first]
+    # Highest similarity of every candidate to anything selected so far
+    redundancy = pairwise[first].copy()
+
+    while len(selected) < k:
+        mmr = lambda_mult * relevance - (1.0 - lambda_mult) * redundancy
+        mmr[selected] = -np.inf
+        best = int(np.argmax(mmr))
+        selected.append(best)
+        np.maximum(redundancy, pairwise[best], out=redundancy)
+
+    return selected
+
+
+def retrieve(
+    query: str,
+    top_k: int = TOP_K,
+    use_mmr: bool = MMR_ENABLED,
+    mmr_lambda: float = MMR_LAMBDA,
+    fetch_k: int = MMR_FETCH_K,
+) -> list[dict]:
     """
     Embed the query and return the top_k most similar chunks.
 
     Args:
-        query  : the user's question
-        top_k  : number of results to return (default from config)
+        query      : the user's question
+        top_k      : number of results to return (default from config)
+        use_mmr    : re-rank a larger candidate pool for diversity
+        mmr_lambda : relevance/diversity trade-off (1.0 = plain top-k)
+        fetch_k    : candidate pool size when use_mmr is True
 
     Returns:
-        List of result dicts sorted by similarity (best first).
+        List of result dicts sorted by similarity (best first), or in MMR
+        selection order when use_mmr is True.
     """
     # Embed the question using the same model used during ingestion
-    response = _openai.embeddings.create(model=EMBEDDING_MODEL, input=[query])
-    query_vector = response.data[0].embedding
-
-    response = _qdrant.query_points(
-        collection_name=COLLECTION_NAME,
-        query=query_vector,
-        limit=top_k,
-        with_payload=True,
-    )
+    with span("embedding", model=EMBEDDING_MODEL) as s:
+        if _batcher is not None:
+            query_vector, usage = _batcher.embed(query)
+            s.set(batched=True, **usage)
+        else:
+            response = _openai.embeddings.create(model=EMBEDDING_MODEL, input=[query])
+            query_vector = response.data[0].embedding
+            if response.usage is not None:
+                s.set(tokens=response.usage.total_tokens)
+
+    use_mmr = use_mmr and fetch_k > top_k
+    with span("qdrant_query", limit=fetch_k if use_mmr else top_k) as s:
+        response = _qdrant.query_points(
+            collection_name=COLLECTION_NAME,
+            query=query_vector,
+            limit=fetch_k if use_mmr else top_k,
+            # MMR only needs vectors for the candidate pool; payloads (chunk
+            # text) are fetched afterwards for the top_k survivors only
+            with_payload=not use_mmr,
+            with_vectors=use_mmr,
+        )
+        s.set(hits=len(response.points))
+
+    hits = response.points
+    qdrant_payloads = {str(hit.id): hit.payload for hit in hits}
+    if use_mmr and hits:
+        with span("mmr_rerank", candidates=len(hits), k=top_k):
+            order = _mmr_select(query_vector, [hit.vector for hit in hits], top_k, mmr_lambda)
+            hits = [hits[i] for i in order]
+        with span("qdrant_payloads", ids=len(hits)):
+            records = _qdrant.retrieve(
+                collection_name=COLLECTION_NAME,
+                ids=[hit.id for hit in hits],
+                with_payload=True,
+                with_vectors=False,
+            )
+            qdrant_payloads = {str(r.id): r.payload for r in records}
+
+    docs = {}
+    if _docstore is not None and hits:
+        with span("docstore_read", ids=len(hits)) as s:
+            docs = _docstore.get_many([str(hit.id) for hit in hits])
+            s.set(found=len(docs))
 
     results = []
-    for hit in response.points:
-        payload = hit.payload or {}
+    missing = 0
+    for hit in hits:
+        # Fall back to the Qdrant payload for points ingested before the docstore
+        payload = docs.get(str(hit.id)) or qdrant_payloads.get(str(hit.id)) or {}
+        if _docstore is not None and "text" not in payload:
+            # Slim point with no docstore row (missing/stale docstore file): an
+            # empty passage would only mislead the LLM, so drop it
+            missing += 1
+            continue
         results.append({
             "text": payload.get("text", ""),
             "score": round(hit.score, 4),
             "source_type": payload.get("source_type", "unknown"),
             "filename": payload.get("filename", "unknown"),
             "chunk_index": payload.get("chunk_index", 0),
+            "filenames": payload.get("filenames"),
             "surah": payload.get("surah"),   # Quran only, None for other sources
             "ayah": payload.get("ayah"),     # Quran only, None for other sources
         })
 
+    if missing:
+        _record_docstore_misses(missing)
+        print(f"[retriever] WARNING: {missing}/{len(hits)} hits missing from docstore "
+              f"'{DOCSTORE_PATH}' — dropped. Is the docstore file present and up to date?")
+
     return results
@@ -10,7 +10,8 @@ Citation format for web results:
 """
 
 from tavily import TavilyClient
-from config import TAVILY_API_KEY, TAVILY_DOMAINS
+from config import TAVILY_API_KEY, TAVILY_DOMAINS, WEB_SEARCH_TIMEOUT_SECONDS
+from src.serving.tracing import span
 
 
 def search_scholar_web(query: str, max_results: int = 3) -> list[dict]:
@@ -32,13 +33,17 @@ def search_scholar_web(query: str, max_results: int = 3) -> list[dict]:
 
     try:
         client = TavilyClient(api_key=TAVILY_API_KEY)
-        response = client.search(
-            query=query,
-            include_domains=TAVILY_DOMAINS,
-            max_results=max_results,
-            search_depth="advanced",
-            include_answer=True,   # Tavily synthesises a clean answer from results
-        )
+        with span("tavily", max_results=max_results) as s:
+            response = client.search(
+                query=query,
+                include_domains=TAVILY_DOMAINS,
+                max_results=max_results,
+                search_depth="advanced",
+                include_answer=True,   # Tavily synthesises a clean answer from results
+                # HTTP timeout so a slow Tavily frees its worker thread instead of piling up
+                timeout=WEB_SEARCH_TIMEOUT_SECONDS,
+            )
+            s.set(results=len(response.get("results", [])))
 
         results = []
 
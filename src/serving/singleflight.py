@@ -0,0 +1,130 @@
+"""
+singleflight.py — Collapse identical in-flight requests into one computation.
+
+When a popular question is asked by many users at once, every /ask request
+would otherwise run its own embed → Qdrant → Tavily → LLM pipeline. With
+single-flight, the first request for a key starts the work and every
+concurrent duplicate waits on that same result.
+
+  - Keys are normalised questions (case, whitespace, trailing punctuation).
+  - Exceptions raised by the computation are re-raised in every waiter.
+  - Each waiter has its own timeout. A caller that times out gets TimeoutError,
+    but a running computation keeps going and still serves the remaining waiters.
+  - Computations run on a bounded pool of max_workers threads, so overload
+    queues work instead of spawning unbounded threads. A queued computation
+    whose waiters have all timed out is abandoned before it starts, so it
+    makes no backend calls.
+  - Nothing is cached: once the computation finishes its key is forgotten,
+    so the next request after that starts fresh.
+"""
+
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Return the coalescing key for a question."""
+    return _WHITESPACE.sub(" ", question).strip().rstrip("?!. ").lower()
+
+
+class _Call:
+    """One in-flight computation and the outcome shared by its waiters."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.waiters = 1
+
+
+class SingleFlight:
+    """
+    Thread-safe single-flight group.
+
+    Usage:
+        group = SingleFlight(max_workers=16)
+        answer = group.do(normalize_question(q), lambda: ask(q), timeout=60)
+    """
+
+    def __init__(self, max_workers: int) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[str, _Call] = {}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="singleflight")
+        self.started = 0    # computations actually run
+        self.shared = 0     # requests that joined an existing computation
+        self.abandoned = 0  # queued computations dropped because nobody was waiting
+
+    def _run(self, key: str, call: _Call, fn: Callable[[], Any]) -> None:
+        with self._lock:
+            if call.waiters == 0:
+                # Every caller timed out while this was queued: skip the work
+                self._calls.pop(key, None)
+                self.abandoned += 1
+                call.error = TimeoutError(f"Abandoned '{key}': no callers left")
+                call.done.set()
+                return
+            self.started += 1
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+        finally:
+            # Forget the key before waking waiters so a request arriving
+            # after completion starts a fresh computation.
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: float | None = None) -> Any:
+        """
+        Run fn once per key among concurrent callers and return its result.
+
+        Args:
+            key     : coalescing key (see normalize_question)
+            fn      : zero-argument callable doing the actual work
+            timeout : seconds to wait for the result, including time queued
+                      for a free worker (None = wait forever)
+
+        Raises:
+            TimeoutError : the result was not ready within timeout
+            Exception    : whatever fn raised, re-raised in every waiter
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.shared += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if leader:
+            # Run on the pool so the leader's timeout behaves like everyone
+            # else's and cannot cancel work that others depend on.
+            self._pool.submit(self._run, key, call, fn)
+
+        if not call.done.wait(timeout):
+            with self._lock:
+                call.waiters -= 1
+            raise TimeoutError(f"No result for '{key}' within {timeout}s")
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self) -> dict:
+        """Counters for monitoring how much load was collapsed."""
+        with self._lock:
+            return {
+                "started": self.started,
+                "shared": self.shared,
+                "abandoned": self.abandoned,
+                "in_flight": len(self._calls),
+            }
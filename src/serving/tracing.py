@@ -0,0 +1,191 @@
+"""
+tracing.py — Opt-in per-request span trees and sampling-profiler capture.
+
+Usage:
+    with trace("ask", question=q, profile=True) as root:
+        answer = ask(q)              # code inside calls span(...)
+    print(format_trace(root))
+
+Instrumented code just wraps a step:
+    with span("qdrant_query", limit=5) as s:
+        ...
+        s.set(hits=len(points))
+
+When no trace is active, span() returns a shared no-op object after a single
+ContextVar lookup — no timing, allocation, or I/O happens, so leaving the
+instrumentation in place costs nothing when tracing is off.
+
+Finished traces are appended as one JSON object per line to TRACE_FILE.
+With profile=True a background thread samples the tracing thread's stack every
+PROFILE_SAMPLE_INTERVAL_MS and writes collapsed stacks ("a;b;c 42" lines) next
+to the trace file. Open them with speedscope.app or flamegraph.pl.
+
+Spans started on worker threads (e.g. the hedged web search) only attach to
+the trace if the task was submitted with contextvars.copy_context().run.
+"""
+
+import contextvars
+import json
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator
+
+from config import TRACE_FILE, PROFILE_DIR, PROFILE_SAMPLE_INTERVAL_MS
+
+_current: contextvars.ContextVar["Span | None"] = contextvars.ContextVar(
+    "trace_span", default=None
+)
+_write_lock = threading.Lock()
+
+
+class Span:
+    """A timed step with attributes (token counts, hit counts, …) and child spans."""
+
+    __slots__ = ("name", "attrs", "children", "duration_ms", "_start", "_token")
+
+    def __init__(self, name: str, attrs: dict) -> None:
+        self.name = name
+        self.attrs = attrs
+        self.children: list[Span] = []
+        self.duration_ms: float | None = None   # None = still running
+        self._start = 0.0
+        self._token = None
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> "Span":
+        self._start = time.perf_counter()
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.duration_ms = round((time.perf_counter() - self._start) * 1000, 2)
+        if exc is not None:
+            self.attrs["error"] = repr(exc)
+        _current.reset(self._token)
+        return False
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "duration_ms": self.duration_ms,
+            "attrs": dict(self.attrs),
+            "children": [c.to_dict() for c in list(self.children)],
+        }
+
+
+class _NoopSpan:
+    """Returned by span() when tracing is off."""
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name: str, **attrs: Any) -> Span | _NoopSpan:
+    """Start a child span of the active span, or a no-op if nothing is being traced."""
+    parent = _current.get()
+    if parent is None:
+        return _NOOP
+    child = Span(name, attrs)
+    parent.children.append(child)
+    return child
+
+
+class _StackSampler:
+    """Samples one thread's Python stack at a fixed interval into folded-stack counts."""
+
+    def __init__(self, thread_id: int, interval_s: float) -> None:
+        self._thread_id = thread_id
+        self._interval = interval_s
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self.counts: dict[str, int] = {}
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{Path(code.co_filename).name}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                key = ";".join(reversed(stack))
+                self.counts[key] = self.counts.get(key, 0) + 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w", encoding="utf-8") as f:
+            for stack, count in sorted(self.counts.items()):
+                f.write(f"{stack} {count}\n")
+
+
+@contextmanager
+def trace(name: str, profile: bool = False, **attrs: Any) -> Iterator[Span]:
+    """
+    Record a span tree for the enclosed block and append it to TRACE_FILE.
+
+    Args:
+        name    : root span name (e.g. "ask")
+        profile : also capture a sampling-profiler flame graph of this thread
+        attrs   : extra attributes stored on the root span
+    """
+    trace_id = uuid.uuid4().hex
+    root = Span(name, attrs)
+    sampler = None
+    if profile:
+        sampler = _StackSampler(threading.get_ident(), PROFILE_SAMPLE_INTERVAL_MS / 1000)
+        sampler.start()
+
+    try:
+        with root:
+            yield root
+    finally:
+        record = {"trace_id": trace_id, "timestamp": time.time(), "root": root.to_dict()}
+        if sampler is not None:
+            sampler.stop()
+            profile_path = Path(PROFILE_DIR) / f"{trace_id}.folded"
+            sampler.write(profile_path)
+            record["profile"] = str(profile_path)
+            root.set(profile=str(profile_path))
+
+        path = Path(TRACE_FILE)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with _write_lock, path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+
+def format_trace(root: Span) -> str:
+    """Render a span tree as indented text for the terminal."""
+    lines = []
+
+    def walk(s: Span, depth: int) -> None:
+        duration = "running" if s.duration_ms is None else f"{s.duration_ms:.1f} ms"
+        extras = " ".join(f"{k}={v}" for k, v in s.attrs.items() if k != "question")
+        lines.append(f"{'  ' * depth}{s.name:<{24 - 2 * depth}} {duration:>12}  {extras}".rstrip())
+        for child in s.children:
+            walk(child, depth + 1)
+
+    walk(root, 0)
+    return "\n".join(lines)
@@ -5,6 +5,11 @@ Run:
     python web_app.py
 
 Then open: http://localhost:5000
+
+Debug tracing (only when TRACE_HEADER_ENABLED=true):
+    X-Debug-Trace: 1        → span tree returned in the response and written to TRACE_FILE
+    X-Debug-Trace: profile  → same, plus a sampling-profiler flame graph
+Traced requests bypass request coalescing so the trace reflects a real run.
 """
 
 import sys
@@ -12,10 +17,17 @@ import os
 sys.path.insert(0, os.path.dirname(__file__))
 
 from flask import Flask, render_template, request, jsonify
-from pipeline import ask
+from pipeline import ask, web_search_stats
+from config import ASK_TIMEOUT_SECONDS, ASK_MAX_CONCURRENT, TRACE_HEADER_ENABLED
+from src.serving.singleflight import SingleFlight, normalize_question
+from src.serving.tracing import trace
+from src.retrieval.retriever import embedding_batch_stats, docstore_stats
 
 app = Flask(__name__)
 
+# Identical questions arriving together run the pipeline once and share the answer
+_inflight = SingleFlight(max_workers=ASK_MAX_CONCURRENT)
+
 
 @app.route("/")
 def index():
@@ -30,15 +42,38 @@ def ask_question():
     if not question:
         return jsonify({"answer": "Please enter a question."}), 400
 
+    debug = request.headers.get("X-Debug-Trace", "").lower() if TRACE_HEADER_ENABLED else ""
+
     try:
-        answer = ask(question)
+        if debug in {"1", "true", "profile"}:
+            with trace("ask", profile=debug == "profile", question=question) as root:
+                answer = ask(question)
+            return jsonify({"answer": answer, "trace": root.to_dict()})
+
+        answer = _inflight.do(
+            normalize_question(question),
+            lambda: ask(question),
+            timeout=ASK_TIMEOUT_SECONDS,
+        )
         return jsonify({"answer": answer})
+    except TimeoutError:
+        return jsonify({"answer": "The request timed out. Please try again."}), 504
     except Exception as e:
         import traceback
         traceback.print_exc()
         return jsonify({"answer": f"Server error: {e}"}), 500
 
 
+@app.route("/stats")
+def stats():
+    return jsonify({
+        "coalescing": _inflight.stats(),
+        "web_search": web_search_stats(),
+        "embedding_batches": embedding_batch_stats(),
+        "docstore": docstore_stats(),
+    })
+
+
 if __name__ == "__main__":
     print("Starting Islamic Finance AI at http://localhost:5000")
     app.run(debug=False, host="0.0.0.0", port=5000)